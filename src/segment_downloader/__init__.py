@@ -11,8 +11,11 @@ from .constants import (
     CATEGORIES_AGE,
     CATEGORIES_SEX,
     CATEGORIES_WEIGHT,
+    CHECKPOINT_INTERVAL,
+    COOKIES_MAX_AGE,
     FILENAME_COOKIES,
     FILENAME_STATE,
+    TIMEOUT_PAGE_LOAD,
 )
 from .downloader import SegmentDownloader
 from .exceptions import SegmentDownloaderException
@@ -23,9 +26,12 @@ __all__ = [
     "SegmentDownloaderException",
     "FILENAME_STATE",
     "FILENAME_COOKIES",
+    "COOKIES_MAX_AGE",
     "CATEGORIES_SEX",
     "CATEGORIES_AGE",
     "CATEGORIES_WEIGHT",
+    "TIMEOUT_PAGE_LOAD",
+    "CHECKPOINT_INTERVAL",
 ]
 
 __version__ = "0.1.3"
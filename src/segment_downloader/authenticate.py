@@ -3,18 +3,33 @@
 Written by Dominik Rappaport, dominik@rappaport.at, 2024
 """
 
+import argparse
 import os
 import pickle
-from time import sleep
+from time import sleep, time
+from urllib.parse import urlparse
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 
-from .constants import FILENAME_COOKIES
+from .constants import COOKIES_MAX_AGE, FILENAME_COOKIES
+
+
+def cookies_are_fresh() -> bool:
+    """Check whether the cookie file has been written recently enough to be reused.
+
+    :return: True if the cookie file exists and is younger than COOKIES_MAX_AGE"""
+    try:
+        return time() - os.path.getmtime(FILENAME_COOKIES) < COOKIES_MAX_AGE
+    except OSError:
+        return False
 
 
 def authenticate():
-    """Login to Strava and save the authentication cookies to a file, so we can reuse it later."""
+    """Login to Strava and save the authentication cookies to a file, so we can reuse it later.
+
+    The cookies are only saved if the login succeeded, i.e. Strava left the login page
+    behind."""
     strava_username = os.getenv("STRAVA_USERNAME")
     strava_password = os.getenv("STRAVA_PASSWORD")
 
@@ -59,6 +74,9 @@ def authenticate():
 
         sleep(5)
 
+        if urlparse(driver.current_url).path.startswith("/login"):
+            raise RuntimeError("Strava didn't accept the login")
+
         # --- Step 4: Save Cookies ---
         with open(FILENAME_COOKIES, "wb") as file:
             pickle.dump(driver.get_cookies(), file)
@@ -68,6 +86,24 @@ def authenticate():
 
 def main():
     """Main function for CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Login to Strava and save the cookies."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Login even if the saved cookies are still fresh.",
+    )
+    args = parser.parse_args()
+
+    # Logging in too often may get the account blocked by Strava
+    if not args.force and cookies_are_fresh():
+        print(
+            f"Cookies in {FILENAME_COOKIES} are still fresh, skipping the login. "
+            f"Use --force to login anyway."
+        )
+        return
+
     try:
         authenticate()
         print(f"Authentication successful! Cookies saved to {FILENAME_COOKIES}")
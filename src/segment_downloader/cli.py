@@ -65,9 +65,20 @@ def main() -> None:
             type=str,
             help=f"Filter by weight group. Comma-separated values from: {', '.join(CATEGORIES_WEIGHT)}",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of browsers downloading the categories concurrently (default: 1).",
+        )
 
         args = parser.parse_args()
 
+        if args.workers < 1:
+            raise SegmentDownloaderException(
+                f"Invalid number of workers: {args.workers}. It must be at least 1."
+            )
+
         # Validate filter arguments
         sex_filters = validate_filter_values(args.filter_sex, CATEGORIES_SEX, "sex")
         age_filters = validate_filter_values(args.filter_age, CATEGORIES_AGE, "age")
@@ -75,7 +86,7 @@ def main() -> None:
             args.filter_weight, CATEGORIES_WEIGHT, "weight"
         )
 
-        leaderboard: SegmentDownloader = (
+        with (
             SegmentDownloader.load_state()
             if args.resume
             else SegmentDownloader(
@@ -83,21 +94,21 @@ def main() -> None:
                 sex_filters=sex_filters if sex_filters else None,
                 age_filters=age_filters if age_filters else None,
                 weight_filters=weight_filters if weight_filters else None,
+                workers=args.workers,
             )
-        )
-
-        # Print filter information
-        if sex_filters or age_filters or weight_filters:
-            print(
-                f"Applying filters - Sex: {sex_filters or 'all'}, "
-                f"Age: {age_filters or 'all'}, Weight: {weight_filters or 'all'}"
-            )
-
-        try:
-            leaderboard.scrape_leaderboard()
-        except KeyboardInterrupt:
-            leaderboard.save_state()
-            sys.exit(0)
+        ) as leaderboard:
+            # Print filter information
+            if sex_filters or age_filters or weight_filters:
+                print(
+                    f"Applying filters - Sex: {sex_filters or 'all'}, "
+                    f"Age: {age_filters or 'all'}, Weight: {weight_filters or 'all'}"
+                )
+
+            try:
+                leaderboard.scrape_leaderboard()
+            except KeyboardInterrupt:
+                leaderboard.save_state()
+                sys.exit(0)
     except SegmentDownloaderException as exc:
         print(f"Error: {exc}", file=sys.stderr)
         sys.exit(1)
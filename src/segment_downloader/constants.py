@@ -8,6 +8,12 @@ from typing import List
 FILENAME_STATE = "state.pkl"
 FILENAME_COOKIES = "cookies.pkl"
 
+COOKIES_MAX_AGE: int = 24 * 60 * 60
+
+TIMEOUT_PAGE_LOAD: int = 15
+
+CHECKPOINT_INTERVAL: int = 60
+
 CATEGORIES_SEX: List[str] = ["Men", "Women"]
 CATEGORIES_AGE: List[str] = [
     "19 and under",
@@ -5,43 +5,76 @@ Written by Dominik Rappaport, dominik@rappaport.at, 2024
 """
 
 import csv
+import itertools
+import os
 import pickle
+import queue
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
+import httpx
+import lxml.etree
+import lxml.html
 from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, WebDriverException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
 from .constants import (
     CATEGORIES_AGE,
     CATEGORIES_SEX,
     CATEGORIES_WEIGHT,
+    CHECKPOINT_INTERVAL,
     FILENAME_COOKIES,
     FILENAME_STATE,
+    TIMEOUT_PAGE_LOAD,
 )
 from .exceptions import SegmentDownloaderException
 
 LeaderBoardType = List[Dict[str, Optional[str]]]
-LeaderBoardFilterType = Tuple[Optional[str], Optional[str], Optional[str]]
+EntryKeyType = Tuple[Optional[str], Optional[str], Optional[str]]
+PhasePlanType = List[Tuple[int, Dict[str, str]]]
 
 
 class SegmentDownloader:
     """Implements all methods to download the leaderboard from Strava."""
 
+    __slots__ = (
+        "segment_id",
+        "sex_filters",
+        "age_filters",
+        "weight_filters",
+        "completed_phase",
+        "completed_page",
+        "finished_phases",
+        "workers",
+        "driver",
+        "main_rows",
+        "main_keys",
+        "age_index",
+        "weight_index",
+    )
+
     def __init__(
         self,
         segment_id: str,
         sex_filters: Optional[List[str]] = None,
         age_filters: Optional[List[str]] = None,
         weight_filters: Optional[List[str]] = None,
-    ):
+        workers: int = 1,
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
         """Initialize the SegmentDownloader object.
 
         :param segment_id: The segment ID as a string
         :param sex_filters: List of sex categories to filter (None = all)
         :param age_filters: List of age categories to filter (None = all)
         :param weight_filters: List of weight categories to filter (None = all)
+        :param workers: Number of browsers scraping the filter phases concurrently
 
         :exception SegmentDownloaderException: If the driver can't be created."""
         self.segment_id: str = segment_id
@@ -50,44 +83,49 @@ class SegmentDownloader:
         self.weight_filters: List[str] = weight_filters or CATEGORIES_WEIGHT
         self.completed_phase: int = 0
         self.completed_page: int = 0
+        self.finished_phases: Set[int] = set()
+        self.workers: int = workers
         self.driver = None
-        self.driver: webdriver.Firefox = self.__create_driver()
+        self.driver: webdriver.Remote = self.__create_driver()
 
-        self.leaderboard_data: Dict[LeaderBoardFilterType, LeaderBoardType] = {
-            (None, None, None): []
-        }
+        self.main_rows: LeaderBoardType = []
+        self.main_keys: Set[EntryKeyType] = set()
+        self.age_index: Dict[EntryKeyType, Tuple[str, str]] = {}
+        self.weight_index: Dict[EntryKeyType, Tuple[str, str]] = {}
 
-        for s in CATEGORIES_SEX:
-            for a in CATEGORIES_AGE:
-                self.leaderboard_data[(s, a, None)] = []
+    def __enter__(self) -> "SegmentDownloader":
+        """Enter the runtime context. The driver is closed when leaving it.
 
-        for s in CATEGORIES_SEX:
-            for w in CATEGORIES_WEIGHT:
-                self.leaderboard_data[(s, None, w)] = []
+        :return: The downloader itself"""
+        return self
 
-    def __del__(self):
-        """Close the driver.
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Close the driver when leaving the runtime context. Errors while closing are
+        ignored, so they don't hide the exception that ended the context.
 
-        :exception SegmentDownloaderException: If the driver can't be closed."""
+        :param exc_type: The type of the exception that ended the context, if any
+        :param exc_value: The exception that ended the context, if any
+        :param traceback: The traceback of the exception, if any"""
         try:
             if self.driver is not None:
                 self.driver.quit()
-        except WebDriverException as exc:
-            raise SegmentDownloaderException(
-                f"Can't close the driver ({exc.msg})."
-            ) from exc
+        except WebDriverException:
+            pass
+        finally:
+            self.driver = None
 
     def __getstate__(self):
         """Return the state of the object for pickling. We need to override this methode to
         exclude the driver object from the state."""
-        state = self.__dict__.copy()
+        state = {name: getattr(self, name) for name in self.__slots__}
         del state["driver"]
         return state
 
     def __setstate__(self, state):
         """Set the state of the object for unpickling. We need to override this method to
         recreate the driver object."""
-        self.__dict__.update(state)
+        for name, value in state.items():
+            setattr(self, name, value)
         self.driver = self.__create_driver()
 
     @staticmethod
@@ -99,7 +137,17 @@ class SegmentDownloader:
         :exception SegmentDownloaderException: If the driver can't be created or"""
         driver: Optional[webdriver.Firefox] = None
         try:
-            driver = webdriver.Firefox()
+            options = webdriver.FirefoxOptions()
+            options.page_load_strategy = "eager"
+            # We only read text, so don't download images and web fonts. Stylesheets are
+            # still needed to operate the filter dropdowns.
+            options.set_preference("permissions.default.image", 2)
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+
+            # Keep the connection to geckodriver open between commands. Every worker has a
+            # driver and thus a connection pool of its own, so the default pool size is
+            # sufficient.
+            driver = webdriver.Firefox(options=options, keep_alive=True)
             driver.get("https://www.strava.com")
 
             with open(FILENAME_COOKIES, "rb") as file:
@@ -122,77 +170,222 @@ class SegmentDownloader:
                 f"Can't load the cookies ({exc})."
             ) from exc
 
-    def __go_to_segment_page(self) -> None:
+    def __go_to_segment_page(self, driver: webdriver.Remote) -> None:
         """Navigate to the segment page.
 
+        :param driver: The driver to use
+
         :exception SegmentDownloaderException: If the segment page can't be retrieved"""
         try:
-            self.driver.get(f"https://www.strava.com/segments/{self.segment_id}")
-            time.sleep(3)
-
-            if self.completed_page > 0:
-                self.__go_to_leaderboard_page()
-
-                time.sleep(3)
+            driver.get(f"https://www.strava.com/segments/{self.segment_id}")
+            WebDriverWait(driver, TIMEOUT_PAGE_LOAD).until(
+                EC.presence_of_element_located((By.ID, "results"))
+            )
         except WebDriverException as exc:
             raise SegmentDownloaderException(
                 f"Can't retrieve the segment page "
                 f"for segment {self.segment_id} ({exc.msg})."
             ) from exc
 
-    def __go_to_leaderboard_page(self) -> None:
-        """Jump forward to the given leaderboard page.
+    def __go_to_leaderboard_page(self, driver: webdriver.Remote, url: str) -> None:
+        """Jump to the given leaderboard page.
 
         Note: Strava's website requires this rather strange methode to manipulate the next page
-        button's link target. If we just call the URL it refers it won't work."""
-        button = self.driver.find_element(By.LINK_TEXT, "→")
-        old_href = button.get_attribute("href")
+        button's link target. If we just call the URL it refers it won't work.
 
-        left = old_href.find("page=") + 5
-        right = old_href[left:].find("&")
+        :param driver: The driver to use
+        :param url: The URL of the leaderboard page"""
+        button = driver.find_element(By.LINK_TEXT, "→")
 
-        new_href = (
-            old_href[:left] + str(self.completed_page + 1) + old_href[left:][right:]
+        driver.execute_script(
+            f'document.getElementById("results").getElementsByClassName("next_page")'
+            f"[0].children[0].setAttribute('href', '{url}')"
         )
+        self.__click_and_wait(driver, button)
 
-        self.driver.execute_script(
-            f'document.getElementById("results").getElementsByClassName("next_page")'
-            f"[0].children[0].setAttribute('href', '{new_href}')"
+    @staticmethod
+    def __page_url_template(href: str) -> str:
+        """Turn the next page button's link target into a template for any page.
+
+        The link target only changes when filters are applied. We therefore derive the
+        URLs of all pages from it instead of reading the button on every page.
+
+        :param href: The link target of the next page button
+        :return: The URL with a {page} placeholder for the page number"""
+        url = urlparse(href)
+        params = [
+            (key, value)
+            for key, value in parse_qsl(url.query, keep_blank_values=True)
+            if key != "page"
+        ]
+        # Braces in the query are percent-encoded, so only the path needs escaping
+        base = urlunparse(url._replace(query="", fragment=""))
+        base = base.replace("{", "{{").replace("}", "}}")
+
+        return f"{base}?{'&'.join(filter(None, [urlencode(params), 'page={page}']))}"
+
+    @staticmethod
+    def __click_and_wait(driver: webdriver.Remote, element: WebElement) -> None:
+        """Click an element that reloads the leaderboard and wait for the new table.
+
+        Strava replaces the result table using JavaScript. We wait until the first row of
+        the old table has been removed from the DOM and the first row of the new table is
+        present.
+
+        :param driver: The driver to use
+        :param element: The element to click
+
+        :exception WebDriverException: If the table isn't reloaded in time"""
+        old_row = driver.find_element(By.XPATH, '//*[@id="results"]/table/tbody/tr')
+        element.click()
+
+        wait = WebDriverWait(driver, TIMEOUT_PAGE_LOAD)
+        wait.until(EC.staleness_of(old_row))
+        wait.until(
+            EC.presence_of_element_located(
+                (By.XPATH, '//*[@id="results"]/table/tbody/tr')
+            )
         )
-        button.click()
 
-    def __read_table(self) -> LeaderBoardType:
+    @staticmethod
+    def __read_table(driver: webdriver.Remote) -> LeaderBoardType:
         """Read the current page's result table.
 
+        The table's HTML code is fetched in a single request and parsed locally, which is
+        a lot faster than querying the browser for every single cell. Parsing it just like
+        the pages fetched over HTTP ensures that the entries' texts are identical no matter
+        how a page was read, as they are matched across the filtered tables.
+
+        :param driver: The driver to use
         :return: A list of dictionaries with the leaderboard's current page's data
 
         :exception SegmentDownloaderException: If the table can't be read"""
-        leaderboard_data: LeaderBoardType = []
+        try:
+            html = driver.find_element(
+                By.XPATH, '//*[@id="results"]/table'
+            ).get_attribute("outerHTML")
+            table = lxml.html.fromstring(html)
+        except WebDriverException as exc:
+            raise SegmentDownloaderException(
+                f"Can't read the leaderboard table ({exc.msg})."
+            ) from exc
+        except lxml.etree.ParserError as exc:
+            raise SegmentDownloaderException(
+                f"Can't read the leaderboard table ({exc})."
+            ) from exc
 
+        return SegmentDownloader.__parse_table(table)
+
+    @staticmethod
+    def __fetch_table(
+        client: httpx.Client, template: str, page: int
+    ) -> Optional[Tuple[LeaderBoardType, bool]]:
+        """Fetch a leaderboard page without using the browser.
+
+        Strava may ignore the page or the filters when the URL is requested directly. The
+        response is therefore only accepted if its pager marks the requested page as the
+        active one and all its links lead to the same filtered view.
+
+        :param client: The HTTP client to use
+        :param template: The URL template of the leaderboard's pages
+        :param page: The number of the page to fetch
+        :return: The page's data and whether there is a next page or None if the
+            response doesn't contain the requested page of the leaderboard table or the
+            table can't be parsed"""
         try:
-            rows = self.driver.find_elements(
-                By.XPATH, '//*[@id="results"]/table/tbody/tr'
+            response = client.get(template.format(page=page))
+            if response.status_code != httpx.codes.OK:
+                return None
+            document = lxml.html.fromstring(response.text)
+        except (httpx.HTTPError, lxml.etree.ParserError):
+            return None
+
+        document.make_links_absolute(str(response.url))
+
+        results = document.xpath('descendant-or-self::*[@id="results"]')
+        tables = results[0].xpath("./table") if results else []
+        pagers = (
+            results[0].xpath(
+                './/ul[.//a[normalize-space()="→" or normalize-space()="←"]]'
             )
-            heads = self.driver.find_elements(
-                By.XPATH, '//*[@id="results"]/table/thead/tr'
+            if results
+            else []
+        )
+        if not tables or not pagers:
+            return None
+
+        active = pagers[0].xpath(
+            './li[contains(concat(" ", normalize-space(@class), " "), " active ")]'
+        )
+        links = pagers[0].xpath(".//a/@href")
+        if (
+            not active
+            or active[0].text_content().strip() != str(page)
+            or any(
+                SegmentDownloader.__page_url_template(link) != template
+                for link in links
             )
+        ):
+            return None
 
-            if (
-                not rows[0].find_element(By.XPATH, ".//td[1]").text
-                == "No results found"
-            ):
-                is_climb = heads[0].find_element(By.XPATH, ".//th[7]").text == "VAM"
+        has_next_page = bool(pagers[0].xpath('.//a[normalize-space()="→"]'))
+
+        try:
+            # The server's HTML may be structured differently than the browser's DOM,
+            # e.g. lack the tbody element the browser inserts
+            return SegmentDownloader.__parse_table(tables[0]), has_next_page
+        except SegmentDownloaderException:
+            return None
+
+    @staticmethod
+    def __create_http_client(driver: webdriver.Remote) -> httpx.Client:
+        """Create an HTTP client sharing the browser's cookies and user agent.
+
+        :param driver: The driver to copy the session from
+        :return: The HTTP client
+
+        :exception WebDriverException: If the browser's session can't be read"""
+        client = httpx.Client(
+            base_url="https://www.strava.com",
+            headers={"User-Agent": driver.execute_script("return navigator.userAgent")},
+            timeout=TIMEOUT_PAGE_LOAD,
+        )
+
+        for cookie in driver.get_cookies():
+            client.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie.get("domain", "")
+            )
+
+        return client
+
+    @staticmethod
+    def __parse_table(table: lxml.html.HtmlElement) -> LeaderBoardType:
+        """Parse a result table.
+
+        :param table: The table element
+        :return: A list of dictionaries with the table's data
+
+        :exception SegmentDownloaderException: If the table can't be parsed"""
+        leaderboard_data: LeaderBoardType = []
+        cell_text = SegmentDownloader.__cell_text
+
+        try:
+            rows = table.xpath("./tbody/tr")
+            heads = table.xpath("./thead/tr")
+
+            if not cell_text(rows[0], 1) == "No results found":
+                is_climb = cell_text(heads[0], 7, "th") == "VAM"
 
                 for row in rows:
-                    name = row.find_element(By.XPATH, ".//td[2]").text
+                    name = cell_text(row, 2)
 
-                    date = row.find_element(By.XPATH, ".//td[3]").text
-                    speed = row.find_element(By.XPATH, ".//td[4]").text[:-5]
+                    date = cell_text(row, 3)
+                    speed = cell_text(row, 4)[:-5]
 
-                    fifth_column = row.find_element(By.XPATH, ".//td[5]").text
+                    fifth_column = cell_text(row, 5)
                     hr = fifth_column[:-4] if fifth_column != "-" else None
 
-                    sixth_column = row.find_element(By.XPATH, ".//td[6]").text
+                    sixth_column = cell_text(row, 6)
                     power = (
                         sixth_column[:-14]
                         if sixth_column.endswith("Power Meter")
@@ -200,12 +393,10 @@ class SegmentDownloader:
                     )
 
                     if is_climb:
-                        vam = row.find_element(By.XPATH, ".//td[7]").text.replace(
-                            ",", ""
-                        )
-                        time_to_finish = row.find_element(By.XPATH, ".//td[8]").text
+                        vam = cell_text(row, 7).replace(",", "")
+                        time_to_finish = cell_text(row, 8)
                     else:
-                        time_to_finish = row.find_element(By.XPATH, ".//td[7]").text
+                        time_to_finish = cell_text(row, 7)
                         vam = None
 
                     leaderboard_data.append(
@@ -219,10 +410,6 @@ class SegmentDownloader:
                             "Time": time_to_finish,
                         }
                     )
-        except WebDriverException as exc:
-            raise SegmentDownloaderException(
-                f"Can't read the leaderboard table ({exc.msg})."
-            ) from exc
         except IndexError as exc:
             raise SegmentDownloaderException(
                 f"Can't read the leaderboard table ({exc}). Either Strava changed the document structure or, more likely, an invalid segment ID was provided."
@@ -230,80 +417,299 @@ class SegmentDownloader:
 
         return leaderboard_data
 
-    def __read_full_tables(self, filters: Dict[str, str]) -> None:
-        """Read the full table
+    @staticmethod
+    def __cell_text(row: lxml.html.HtmlElement, column: int, tag: str = "td") -> str:
+        """Return the text of a table cell the way the browser displays it.
+
+        :param row: The table row
+        :param column: The column, starting with 1
+        :param tag: The tag name of the row's cells
+        :return: The cell's text with any whitespace collapsed
+
+        :exception IndexError: If the row doesn't have that many cells"""
+        return " ".join(row.xpath(f"./{tag}[{column}]")[0].text_content().split())
+
+    def __read_full_tables(
+        self, driver: webdriver.Remote, filters: Dict[str, str], page: int
+    ) -> Iterator[LeaderBoardType]:
+        """Read the full table page by page.
+
+        The browser is only needed to apply the filters and to read the first page. The
+        following pages are fetched with a plain HTTP client sharing the browser's
+        session, which is a lot faster. If Strava doesn't deliver a page that way, we
+        fall back to the browser for the rest of the table.
 
+        When resuming, the skipped pages are not visited at all. We directly continue with
+        the first page not read yet, once the filters have been applied.
+
+        Reading stops as soon as a page doesn't contain any entry not seen before, so a
+        pager that doesn't move on can't keep us reading forever.
+
+        :param driver: The driver to use
         :param filters: The filters to apply to the table
+        :param page: The number of leaderboard pages to skip
+        :return: An iterator over the leaderboard's pages
 
         :exception SegmentDownloaderException: If the table can't be read or
         the filters can't be applied"""
-        sex: Optional[str] = filters["sex"] if "sex" in filters else None
-        age: Optional[str] = filters["age"] if "age" in filters else None
-        weight: Optional[str] = filters["weight"] if "weight" in filters else None
+        self.__go_to_segment_page(driver)
 
         try:
-            self.__apply_filters(filters)
+            self.__apply_filters(driver, filters)
         except WebDriverException as exc:
-            return
+            raise SegmentDownloaderException(
+                f"Can't apply the filters {filters} ({exc.msg})."
+            ) from exc
 
-        while True:
-            try:
-                current_page = self.__read_table()
+        use_http = True
+        seen_keys: Set[EntryKeyType] = set()
 
-                self.leaderboard_data[(sex, age, weight)].extend(current_page)
+        try:
+            next_href = self.__next_page_href(driver)
+            has_next_page = next_href is not None
+            template = self.__page_url_template(next_href) if next_href else ""
+
+            if page > 0 and not has_next_page:
+                # The table has a single page only, which has been read already
+                return
+
+            with self.__create_http_client(driver) as client:
+                # The browser displays the first page, so it doesn't need to be fetched
+                current_page = self.__read_table(driver) if page == 0 else None
+
+                while True:
+                    if current_page is None:
+                        fetched = (
+                            self.__fetch_table(client, template, page + 1)
+                            if use_http
+                            else None
+                        )
+                        if fetched is None:
+                            use_http = False
+                            self.__go_to_leaderboard_page(
+                                driver, template.format(page=page + 1)
+                            )
+                            current_page = self.__read_table(driver)
+                            has_next_page = self.__next_page_href(driver) is not None
+                        else:
+                            current_page, has_next_page = fetched
+
+                    keys = {self.__entry_key(row) for row in current_page}
+                    if not keys - seen_keys:
+                        # Either we resumed right behind the last page or the page
+                        # didn't change
+                        break
+                    seen_keys.update(keys)
 
-                self.completed_page += 1
+                    yield current_page
+                    page += 1
+
+                    if not has_next_page:
+                        break
+
+                    current_page = None
+        except WebDriverException as exc:
+            raise SegmentDownloaderException(
+                f"Can't navigate to the next page ({exc.msg})."
+            ) from exc
 
-                self.driver.find_element(By.LINK_TEXT, "→").click()
-                time.sleep(5)
-            except NoSuchElementException:
-                break
-            except WebDriverException as exc:
-                raise SegmentDownloaderException(
-                    f"Can't navigate to the next page ({exc.msg})."
-                ) from exc
+    @staticmethod
+    def __next_page_href(driver: webdriver.Remote) -> Optional[str]:
+        """Return the link target of the next page button.
 
-    def __apply_filters(self, filters: Dict[str, str]) -> None:
+        :param driver: The driver to use
+        :return: The URL of the next page or None if it is the last page"""
+        try:
+            return driver.find_element(By.LINK_TEXT, "→").get_attribute("href")
+        except NoSuchElementException:
+            return None
+
+    def __apply_filters(
+        self, driver: webdriver.Remote, filters: Dict[str, str]
+    ) -> None:
         """Apply the filters to the leaderboard view."""
         if "age" in filters:
-            self.driver.find_element(
-                By.CSS_SELECTOR, ".list-unstyled:nth-child(5) .expand"
-            ).click()
-            time.sleep(3)
-            self.driver.find_element(By.LINK_TEXT, filters["age"]).click()
-            time.sleep(3)
+            self.__select_filter(
+                driver, ".list-unstyled:nth-child(5) .expand", filters["age"]
+            )
         if "weight" in filters:
-            self.driver.find_element(
-                By.CSS_SELECTOR, ".list-unstyled:nth-child(6) .expand"
-            ).click()
-            time.sleep(3)
-            self.driver.find_element(By.LINK_TEXT, filters["weight"]).click()
-            time.sleep(3)
+            self.__select_filter(
+                driver, ".list-unstyled:nth-child(6) .expand", filters["weight"]
+            )
         if "sex" in filters:
-            self.driver.find_element(
-                By.CSS_SELECTOR, ".text-nowrap:nth-child(4) .btn"
-            ).click()
-            time.sleep(3)
-            self.driver.find_element(By.LINK_TEXT, filters["sex"]).click()
-            time.sleep(3)
+            self.__select_filter(
+                driver, ".text-nowrap:nth-child(4) .btn", filters["sex"]
+            )
+
+    def __select_filter(
+        self, driver: webdriver.Remote, dropdown_selector: str, link_text: str
+    ) -> None:
+        """Open a filter dropdown and select one of its entries.
+
+        :param driver: The driver to use
+        :param dropdown_selector: The CSS selector of the dropdown button
+        :param link_text: The label of the entry to select"""
+        driver.find_element(By.CSS_SELECTOR, dropdown_selector).click()
+        link = WebDriverWait(driver, TIMEOUT_PAGE_LOAD).until(
+            EC.element_to_be_clickable((By.LINK_TEXT, link_text))
+        )
+        self.__click_and_wait(driver, link)
 
     def __scrape_current_leaderboard(
         self, filters: Dict[str, str], phase_counter: int
     ) -> None:
         """Scape the leaderboard and return the dictionary.
 
+        Saving the state pickles all rows read so far. It is therefore saved every
+        CHECKPOINT_INTERVAL seconds only rather than after every page, and in any case
+        once the phase is complete.
+
         :param filters: The filters to apply to the table
         :param phase_counter: The current phase
         :return: A list of dictionaries with the leaderboard data
 
         :exception SegmentDownloaderException: If the leaderboard can't be scraped"""
         if self.completed_phase < phase_counter:
-            self.__go_to_segment_page()
+            last_save = time.monotonic()
+
+            for current_page in self.__read_full_tables(
+                self.driver, filters, self.completed_page
+            ):
+                self.__store_rows(filters, current_page)
+                self.completed_page += 1
 
-            self.__read_full_tables(filters)
+                if time.monotonic() - last_save >= CHECKPOINT_INTERVAL:
+                    self.save_state()
+                    last_save = time.monotonic()
 
             self.completed_phase += 1
             self.completed_page = 0
+            self.save_state()
+
+    def __scrape_phases_in_parallel(self, phases: PhasePlanType) -> None:
+        """Scrape the phases concurrently, each worker using a browser of its own.
+
+        A worker collects all pages of its phase and merges them into the leaderboard data
+        only once the phase is complete. Phases which are interrupted are therefore
+        started from scratch when resuming. If a phase fails or the run is interrupted,
+        the running workers stop after their current page and are waited for before
+        the browsers are closed.
+
+        :param phases: The phase counters and filters of all phases
+
+        :exception SegmentDownloaderException: If the leaderboard can't be scraped"""
+        pending = [
+            (phase_counter, filters)
+            for phase_counter, filters in phases
+            if phase_counter > self.completed_phase
+            and phase_counter not in self.finished_phases
+        ]
+        if not pending:
+            return
+
+        drivers: "queue.Queue[webdriver.Remote]" = queue.Queue()
+        drivers.put(self.driver)
+        extra_drivers: List[webdriver.Remote] = []
+        lock = threading.Lock()
+        stopped = threading.Event()
+
+        def scrape_phase(phase_counter: int, filters: Dict[str, str]) -> None:
+            driver = drivers.get()
+            try:
+                rows: LeaderBoardType = []
+                for current_page in self.__read_full_tables(driver, filters, 0):
+                    if stopped.is_set():
+                        return
+                    rows.extend(current_page)
+            finally:
+                drivers.put(driver)
+
+            with lock:
+                if not stopped.is_set():
+                    self.__store_rows(filters, rows)
+                    self.__finish_phase(phase_counter)
+                    self.save_state()
+
+        try:
+            for _ in range(min(self.workers, len(pending)) - 1):
+                driver = self.__create_driver()
+                extra_drivers.append(driver)
+                drivers.put(driver)
+
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+            try:
+                futures = [executor.submit(scrape_phase, *phase) for phase in pending]
+                for future in as_completed(futures):
+                    future.result()
+            finally:
+                with lock:
+                    stopped.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            for driver in extra_drivers:
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
+
+    def __finish_phase(self, phase_counter: int) -> None:
+        """Mark a phase as finished, possibly out of order.
+
+        :param phase_counter: The finished phase"""
+        self.finished_phases.add(phase_counter)
+        while self.completed_phase + 1 in self.finished_phases:
+            self.completed_phase += 1
+            self.finished_phases.remove(self.completed_phase)
+
+    def __store_rows(self, filters: Dict[str, str], rows: LeaderBoardType) -> None:
+        """Store the rows read with the given filters applied.
+
+        The filtered tables are only needed to look up the categories of the full
+        leaderboard's entries. We therefore just add their entries' keys to the index
+        of the respective category.
+
+        If new efforts are uploaded while we read the leaderboard, entries move on to the
+        next page and would be read twice. Rows of the full leaderboard whose key has
+        already been seen are therefore skipped.
+
+        :param filters: The filters applied to the table
+        :param rows: The rows read"""
+        if "age" in filters:
+            for row in rows:
+                self.age_index.setdefault(
+                    self.__entry_key(row), (filters["sex"], filters["age"])
+                )
+        elif "weight" in filters:
+            for row in rows:
+                self.weight_index.setdefault(
+                    self.__entry_key(row), (filters["sex"], filters["weight"])
+                )
+        else:
+            for row in rows:
+                key = self.__entry_key(row)
+                if key not in self.main_keys:
+                    self.main_keys.add(key)
+                    self.main_rows.append(row)
+
+    def __build_plan(self) -> PhasePlanType:
+        """Build the list of all phases.
+
+        The first phase reads the full leaderboard, followed by one phase per combination
+        of sex and age group and one phase per combination of sex and weight group. The
+        order is fixed, so a phase's counter identifies it when resuming.
+
+        :return: The phase counters and filters of all phases"""
+        filter_list: List[Dict[str, str]] = [{}]
+        filter_list.extend(
+            {"sex": s, "age": a}
+            for s, a in itertools.product(self.sex_filters, self.age_filters)
+        )
+        filter_list.extend(
+            {"sex": s, "weight": w}
+            for s, w in itertools.product(self.sex_filters, self.weight_filters)
+        )
+
+        return list(enumerate(filter_list, start=1))
 
     def scrape_leaderboard(self) -> None:
         """Scrape the leaderboard, add the categories and write the data to a CSV file.
@@ -311,23 +717,13 @@ class SegmentDownloader:
         :exception SegmentDownloaderException: If the leaderboard can't be scraped or
         the data can't be written to a CSV file."""
         try:
-            phase_counter: int = 1
-            self.__scrape_current_leaderboard({}, phase_counter)
-            phase_counter += 1
-
-            for s in self.sex_filters:
-                for a in self.age_filters:
-                    self.__scrape_current_leaderboard(
-                        {"sex": s, "age": a}, phase_counter
-                    )
-                    phase_counter += 1
+            plan = self.__build_plan()
 
-            for s in self.sex_filters:
-                for w in self.weight_filters:
-                    self.__scrape_current_leaderboard(
-                        {"sex": s, "weight": w}, phase_counter
-                    )
-                    phase_counter += 1
+            if self.workers > 1:
+                self.__scrape_phases_in_parallel(plan)
+            else:
+                for phase_counter, filters in plan:
+                    self.__scrape_current_leaderboard(filters, phase_counter)
 
             self.__add_attributes()
 
@@ -354,41 +750,39 @@ class SegmentDownloader:
                         )
                     )
 
-                self.leaderboard_data[(None, None, None)] = list(
-                    filter(match_cli_filters, self.leaderboard_data[(None, None, None)])
-                )
+                self.main_rows = list(filter(match_cli_filters, self.main_rows))
 
             self.__write_to_csv()
         except WebDriverException as exc:
+            self.save_state()
             raise SegmentDownloaderException(
                 f"Can't close the driver ({exc.msg})."
             ) from exc
+        except SegmentDownloaderException:
+            self.save_state()
+            raise
 
     def __add_attributes(self) -> None:
         """Add the attributes to the leaderboard data."""
-        for i, entry in enumerate(self.leaderboard_data[(None, None, None)]):
-            c_s: Optional[str] = None
-            c_w: Optional[str] = None
-            c_a: Optional[str] = None
-
-            for s in CATEGORIES_SEX:
-                for a in CATEGORIES_AGE:
-                    if entry in self.leaderboard_data[(s, a, None)]:
-                        c_s = s
-                        c_a = a
-                        break
+        for i, entry in enumerate(self.main_rows):
+            key = self.__entry_key(entry)
+            c_s, c_a = self.age_index.get(key, (None, None))
+            weight_sex, c_w = self.weight_index.get(key, (None, None))
+            if weight_sex is not None:
+                c_s = weight_sex
+
+            entry["Age group"] = c_a
+            entry["Weight group"] = c_w
+            entry["Sex"] = c_s
+            entry["Position"] = str(i + 1)
 
-            for s in CATEGORIES_SEX:
-                for w in CATEGORIES_WEIGHT:
-                    if entry in self.leaderboard_data[(s, None, w)]:
-                        c_s = s
-                        c_w = w
-                        break
+    @staticmethod
+    def __entry_key(entry: Dict[str, Optional[str]]) -> EntryKeyType:
+        """Return the key identifying a leaderboard entry across the filtered tables.
 
-            self.leaderboard_data[(None, None, None)][i]["Age group"] = c_a
-            self.leaderboard_data[(None, None, None)][i]["Weight group"] = c_w
-            self.leaderboard_data[(None, None, None)][i]["Sex"] = c_s
-            self.leaderboard_data[(None, None, None)][i]["Position"] = str(i + 1)
+        :param entry: The leaderboard entry
+        :return: The key as a tuple of name, date and time"""
+        return entry["Name"], entry["Date"], entry["Time"]
 
     def __write_to_csv(self) -> None:
         """Write the data to a CSV file.
@@ -411,9 +805,12 @@ class SegmentDownloader:
 
         try:
             with open(filename, "w", encoding="utf-8") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=field_names)
-                writer.writeheader()
-                writer.writerows(self.leaderboard_data[(None, None, None)])
+                writer = csv.writer(csvfile)
+                writer.writerow(field_names)
+                writer.writerows(
+                    [row.get(field_name, "") for field_name in field_names]
+                    for row in self.main_rows
+                )
         except (IOError, csv.Error) as exc:
             raise SegmentDownloaderException(
                 f"Can't write the leaderboard data to a CSV file ({exc})"
@@ -422,10 +819,16 @@ class SegmentDownloader:
     def save_state(self) -> None:
         """Save the current state of the SegmentDownloader object.
 
+        The state is written to a temporary file first, which then replaces the previous
+        state. An interruption while saving therefore never leaves a corrupt state file.
+
         :exception SegmentDownloaderException: If the state can't be saved."""
+        filename_tmp = f"{FILENAME_STATE}.tmp"
+
         try:
-            with open(FILENAME_STATE, "wb") as file:
+            with open(filename_tmp, "wb") as file:
                 pickle.dump(self, file)
+            os.replace(filename_tmp, FILENAME_STATE)
         except (IOError, pickle.PickleError) as exc:
             raise SegmentDownloaderException(f"Can't save the state ({exc}).") from exc
 
@@ -439,5 +842,5 @@ class SegmentDownloader:
         try:
             with open(FILENAME_STATE, "rb") as file:
                 return pickle.load(file)
-        except (IOError, pickle.PickleError) as exc:
+        except (IOError, pickle.PickleError, AttributeError) as exc:
             raise SegmentDownloaderException(f"Can't load the state ({exc}).") from exc